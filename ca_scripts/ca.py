@@ -9,6 +9,10 @@ import tarfile
 from enum import Enum
 from pathlib import Path
 from jinja2 import Template
+from datetime import datetime, timedelta, timezone
+
+from .database import readIndex, readCRL
+from .mirror import Mirror, isReplica, mirrored_files, mirrored_subdirs
 
 
 class PathType(Enum):
@@ -52,6 +56,8 @@ class CA():
         'intermediateCertificate': "{}/intermediate-ca.pem".format(subdirs['intermediate_certs']['path']),
         'intermediateCSR':         "{}/intermediate-csr.pem".format(subdirs['intermediate_csr']['path']),
 
+        'intermediateCRL':         "{}/intermediate-crl.pem".format(subdirs['intermediate_crl']['path']),
+
         'CAcertificateChain':      "{}/ca-chain-cert.pem".format(subdirs['intermediate_certs']['path'])
     }
 
@@ -64,11 +70,12 @@ class CA():
         else:
             root_dir = global_options.root_dir
 
-        for key, value in self.subdirs.items():
-            self.subdirs[key] = { 'path': root_dir + value['path'], 'mode': value['mode'] }
+        #  Per instance copies, so that a second CA, e.g. a replica, does
+        #  not get the root directory prepended twice
+        self.subdirs = { key: { 'path': root_dir + value['path'], 'mode': value['mode'] }
+                         for key, value in CA.subdirs.items() }
 
-        for key, value in self.files.items():
-            self.files[key] = root_dir + value
+        self.files = { key: root_dir + value for key, value in CA.files.items() }
 
         self.rootKeyLength         = 4096
         self.intermediateKeyLength = 4096
@@ -106,6 +113,15 @@ class CA():
         if not Path(self.rootDir).exists():
             raise FileNotFoundError(errno.ENOENT, "Top level CA directory was not found",
                                     self.rootDir)
+
+        if isReplica(self.rootDir):
+            #  A replica only holds the public parts of the CA
+            for key in mirrored_files:
+                self.CheckIfFileExists(self.files[key])
+            for key in mirrored_subdirs:
+                self.CheckIfDirectoryExists(self.subdirs[key]['path'])
+            return
+
         try:
             self.CheckIfFileExists(self.files['rootConfig'])
             self.CheckIfFileExists(self.files['rootIndex'])
@@ -352,6 +368,65 @@ class CA():
             click.secho("Done")
 
 
+    def listCertificates(self, status=None, expiresWithin=None):
+        """
+          Print the certificates in the intermediate CA database. The
+          database is streamed, so memory usage does not grow with the
+          number of entries.
+
+          Args:
+              status:        only list entries with this status (V, R or E).
+              expiresWithin: only list entries that expire within this many
+                             days.
+        """
+        deadline = None
+        if expiresWithin is not None:
+            deadline = datetime.now(timezone.utc) + timedelta(days=expiresWithin)
+
+        for record in readIndex(self.files['intermediateIndex']):
+            if status and record.status != status:
+                continue
+            if deadline and record.getExpiryDate() > deadline:
+                continue
+            click.echo("{}\t{}\t{}\t{}".format(record.status, record.serial,
+                                               record.expires, record.subject))
+
+
+    def listRevoked(self, crl=None):
+        """
+          Print the serial numbers and revocation dates listed in a CRL.
+          Defaults to the CRL of the intermediate CA.
+        """
+        if not crl:
+            crl = self.files['intermediateCRL']
+        self.CheckIfFileExists(crl)
+
+        for record in readCRL(crl):
+            click.echo("{}\t{}".format(record.serial, record.revoked))
+
+
+    def mirror(self, replicaDir):
+        """
+          Synchronise the certificates, chain, CRLs and indexes to a
+          read-only replica. Only files that changed since the last sync
+          are copied.
+        """
+        if os.path.abspath(replicaDir) == os.path.abspath(self.rootDir):
+            raise ValueError("Replica directory must differ from the CA directory")
+
+        sequence, changes = Mirror(self, replicaDir).sync()
+
+        for action, path in changes:
+            if self.verbose_level > 1:
+                click.secho("{}: {}".format(action, path))
+
+        if self.verbose_level > 0:
+            if changes:
+                click.secho("Replica at sequence {}, {} change(s)".format(sequence, len(changes)))
+            else:
+                click.secho("Replica up to date at sequence {}".format(sequence))
+
+
 class GlobalOptions:
     def __init__(self, root_dir, verbose_level):
         self.root_dir = root_dir
@@ -483,6 +558,66 @@ def get_certs(global_options, fqdn):
     ca.getCerts()
 
 
+@cli.command('list')
+@click.option('--status', type=click.Choice(['V', 'R', 'E']), default=None,
+              help="Only list certificates with this status.")
+@click.option('--expires-within', type=int, default=None, metavar="<days>",
+              help="Only list certificates that expire within <days> days.")
+@click.pass_obj
+def list_certificates(global_options, status, expires_within):
+    """
+      List the certificates in the intermediate CA database.
+    """
+    try:
+        ca = CA(global_options)
+        ca.listCertificates(status, expires_within)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+
+
+@cli.command('list-crl')
+@click.argument('crl-file', required=False)
+@click.pass_obj
+def list_crl(global_options, crl_file):
+    """
+      List the revoked certificates in a CRL (PEM or DER). Defaults to the
+      CRL of the intermediate CA.
+    """
+    try:
+        ca = CA(global_options)
+        ca.listRevoked(crl_file)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+
+
+@cli.command('mirror')
+@click.argument('replica-dir', metavar="<replica_dir>")
+@click.pass_obj
+def mirror(global_options, replica_dir):
+    """
+      Incrementally synchronise the public parts of the CA to a read-only
+      replica. The replica can be used as --ca-dir for get-certs.
+    """
+    try:
+        ca = CA(global_options)
+        ca.mirror(replica_dir)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+
+
+@cli.command('mirror-log')
+@click.option('--since', type=int, default=0, metavar="<int>",
+              help="Only show changes after this sequence number.")
+@click.argument('replica-dir', metavar="<replica_dir>")
+@click.pass_obj
+def mirror_log(global_options, since, replica_dir):
+    """
+      Show the change log of a replica.
+    """
+    for sequence, action, path in Mirror(None, replica_dir).getChanges(since):
+        click.echo("{}\t{}\t{}".format(sequence, action, path))
+
+
 @cli.command()
 def version():
     """
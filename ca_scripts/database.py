@@ -0,0 +1,257 @@
+import base64
+import mmap
+import tempfile
+
+from datetime import datetime, timezone
+
+
+class IndexRecord:
+    """
+      A single entry of an OpenSSL CA database (index.txt). The record uses
+      __slots__ so that only the entry currently being looked at needs to
+      be kept in memory.
+    """
+    __slots__ = ('status', 'expires', 'revoked', 'serial', 'filename', 'subject')
+
+    def __init__(self, status, expires, revoked, serial, filename, subject):
+        self.status   = status
+        self.expires  = expires
+        self.revoked  = revoked
+        self.serial   = serial
+        self.filename = filename
+        self.subject  = subject
+
+
+    def getExpiryDate(self):
+        return parseTime(self.expires)
+
+
+    def getRevocationDate(self):
+        """
+          Return the revocation date, or None if the certificate has not
+          been revoked. The optional reason after the comma is ignored.
+        """
+        if not self.revoked:
+            return None
+        return parseTime(self.revoked.split(",", 1)[0])
+
+
+class CRLRecord:
+    """
+      A single revoked certificate as listed in a CRL.
+    """
+    __slots__ = ('serial', 'revoked')
+
+    def __init__(self, serial, revoked):
+        self.serial  = serial
+        self.revoked = revoked
+
+
+    def getRevocationDate(self):
+        return parseTime(self.revoked)
+
+
+def parseTime(value):
+    """
+      Convert an ASN.1 UTCTime (YYMMDDHHMMSSZ) or GeneralizedTime
+      (YYYYMMDDHHMMSSZ) string into an aware datetime.
+    """
+    if len(value) == 13:
+        fmt = "%y%m%d%H%M%SZ"
+    else:
+        fmt = "%Y%m%d%H%M%SZ"
+    return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+
+
+def mapFile(f):
+    """
+      Memory map an open file read-only. Returns None for empty files,
+      since those cannot be mapped.
+    """
+    f.seek(0, 2)
+    if f.tell() == 0:
+        return None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def readIndex(filename):
+    """
+      Iterate over the entries of a CA database without reading the whole
+      file into memory. The file is memory mapped and records are yielded
+      one line at a time. OpenSSL does not guarantee that subjects are
+      UTF-8, so undecodable bytes are replaced rather than aborting.
+
+      Args:
+          filename: path to the index.txt file.
+    """
+    with open(filename, "rb") as f:
+        mm = mapFile(f)
+        if mm is None:
+            return
+        try:
+            for line in iter(mm.readline, b""):
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                fields = line.decode("utf-8", errors="replace").split("\t", 5)
+                if len(fields) != 6:
+                    raise ValueError("Malformed line in {}: {!r}".format(filename, line))
+                yield IndexRecord(*fields)
+        finally:
+            mm.close()
+
+
+def readCRL(filename):
+    """
+      Iterate over the revoked certificates of a CRL in either PEM or DER
+      format. PEM files are decoded line by line into a temporary file, so
+      that in both cases the DER structure can be walked through a memory
+      map.
+
+      Args:
+          filename: path to the CRL.
+    """
+    with open(filename, "rb") as f:
+        if f.read(1) == b"\x30":
+            yield from readDERCRL(f)
+            return
+
+        f.seek(0)
+        with tempfile.TemporaryFile() as der:
+            decodePEM(f, der)
+            yield from readDERCRL(der)
+
+
+def decodePEM(src, dest):
+    """
+      Base64 decode the body of a PEM file from src into dest. Lines are
+      decoded in chunks that are a multiple of 4 characters, so the
+      encoded data never has to be held in memory as a whole.
+    """
+    pending = b""
+    inside  = False
+
+    for line in src:
+        line = line.strip()
+        if line.startswith(b"-----BEGIN"):
+            inside = True
+            continue
+        if line.startswith(b"-----END"):
+            break
+        if not inside or not line:
+            continue
+
+        pending += line
+        usable   = len(pending) - len(pending) % 4
+        dest.write(base64.b64decode(pending[:usable]))
+        pending  = pending[usable:]
+
+    if not inside:
+        raise ValueError("No PEM data found")
+    if pending:
+        dest.write(base64.b64decode(pending))
+    dest.flush()
+
+
+def readDERHeader(buf, offset, end, expected=None):
+    """
+      Read the tag and length of the DER element at offset. Returns the
+      tag, the offset of the content and the length of the content.
+
+      Args:
+          buf:      buffer holding the DER data.
+          offset:   offset of the element.
+          end:      end of the enclosing element; the element must fit
+                    within it.
+          expected: tag, or tuple of tags, the element must have.
+    """
+    if offset + 2 > end:
+        raise ValueError("Malformed CRL: element header at {} is truncated".format(offset))
+
+    tag    = buf[offset]
+    length = buf[offset + 1]
+    offset += 2
+
+    if length & 0x80:
+        count  = length & 0x7f
+        if count == 0 or offset + count > end:
+            raise ValueError("Malformed CRL: invalid length at {}".format(offset - 2))
+        length = int.from_bytes(buf[offset:offset + count], "big")
+        offset += count
+
+    if offset + length > end:
+        raise ValueError("Malformed CRL: element at {} exceeds its parent".format(offset))
+
+    if expected is not None:
+        if isinstance(expected, int):
+            expected = (expected,)
+        if tag not in expected:
+            raise ValueError("Malformed CRL: unexpected tag 0x{:02x} at {}".format(tag, offset))
+
+    return tag, offset, length
+
+
+def readDERCRL(f):
+    """
+      Walk the DER encoded CertificateList in f and yield a CRLRecord for
+      each entry in revokedCertificates.
+    """
+    mm = mapFile(f)
+    if mm is None:
+        return
+    try:
+        # CertificateList ::= SEQUENCE { tbsCertList, ... }
+        tag, offset, length = readDERHeader(mm, 0, len(mm), 0x30)
+        tag, offset, length = readDERHeader(mm, offset, offset + length, 0x30)
+        end = offset + length
+
+        # version, if present
+        tag, start, length = readDERHeader(mm, offset, end)
+        if tag == 0x02:
+            offset = start + length
+            tag, start, length = readDERHeader(mm, offset, end)
+        if tag != 0x30:
+            raise ValueError("Malformed CRL: signature algorithm is not a SEQUENCE")
+
+        # issuer
+        offset = start + length
+        tag, start, length = readDERHeader(mm, offset, end, 0x30)
+        offset = start + length
+
+        # thisUpdate and the optional nextUpdate
+        tag, start, length = readDERHeader(mm, offset, end, (0x17, 0x18))
+        offset = start + length
+        if offset < end:
+            tag, start, length = readDERHeader(mm, offset, end)
+            if tag in (0x17, 0x18):
+                offset = start + length
+
+        # revokedCertificates is optional, crlExtensions is tagged [0]
+        if offset >= end:
+            return
+        tag, start, length = readDERHeader(mm, offset, end)
+        if tag != 0x30:
+            return
+
+        offset = start
+        revokedEnd = start + length
+        while offset < revokedEnd:
+            tag, start, length = readDERHeader(mm, offset, revokedEnd, 0x30)
+            offset    = start + length
+            entryEnd  = offset
+
+            tag, serialStart, serialLength = readDERHeader(mm, start, entryEnd, 0x02)
+            serialEnd = serialStart + serialLength
+            if serialLength > 1 and mm[serialStart] == 0:
+                serialStart += 1
+            serial = mm[serialStart:serialEnd].hex().upper()
+
+            tag, timeStart, timeLength = readDERHeader(mm, serialEnd, entryEnd, (0x17, 0x18))
+            try:
+                revoked = mm[timeStart:timeStart + timeLength].decode("ascii")
+            except UnicodeDecodeError:
+                raise ValueError("Malformed CRL: invalid revocation date at {}".format(timeStart))
+
+            yield CRLRecord(serial, revoked)
+    finally:
+        mm.close()
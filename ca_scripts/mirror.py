@@ -0,0 +1,278 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from pathlib import Path
+
+
+manifest_name  = ".mirror"
+changelog_name = "changes.log"
+
+# Parts of the CA that are public and are copied to a replica. Private keys,
+# CSRs and configuration never leave the signing host.
+mirrored_subdirs = [
+    'root_certs',
+    'root_crl',
+    'root_newcerts',
+    'intermediate_certs',
+    'intermediate_crl',
+    'intermediate_newcerts'
+]
+
+mirrored_files = [
+    'rootIndex',
+    'intermediateIndex'
+]
+
+
+def isReplica(path):
+    return Path(path, manifest_name).exists()
+
+
+def copyBytes(src, out, count, digest=None):
+    """
+      Copy at most count bytes from the open file src to out, updating
+      digest with every byte copied. Returns the number of bytes copied.
+    """
+    copied = 0
+    while copied < count:
+        chunk = src.read(min(65536, count - copied))
+        if not chunk:
+            break
+        out.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        copied += len(chunk)
+    return copied
+
+
+class DigestWriter():
+    """
+      Stand-in for a file that only feeds what is written to a digest.
+    """
+
+    def __init__(self, digest):
+        self.digest = digest
+
+
+    def write(self, data):
+        self.digest.update(data)
+
+
+class Mirror():
+    """
+      Incrementally synchronise the public parts of a CA to a read-only
+      replica directory. The replica has the same layout as the CA, so the
+      regular commands, e.g. get-certs, can be pointed at it.
+
+      Each sync gets a sequence number. The replica keeps a manifest with
+      the state of every mirrored file at the last sequence number, and a
+      change log listing what changed in each sync.
+    """
+
+    def __init__(self, ca, replicaDir):
+        self.ca         = ca
+        self.replicaDir = replicaDir
+        self.manifest   = Path(replicaDir, manifest_name)
+        self.changelog  = Path(replicaDir, changelog_name)
+
+
+    def getSourcePaths(self):
+        """
+          Yield the relative path of every file on the signing host that
+          should be present on the replica.
+        """
+        for key in mirrored_files:
+            path = self.ca.files[key]
+            if Path(path).exists():
+                yield os.path.relpath(path, self.ca.rootDir)
+
+        for key in mirrored_subdirs:
+            path = self.ca.subdirs[key]['path']
+            for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                if entry.is_file():
+                    yield os.path.relpath(entry.path, self.ca.rootDir)
+
+
+    def loadManifest(self):
+        if not self.manifest.exists():
+            return { 'sequence': 0, 'files': {} }
+        with open(self.manifest) as f:
+            return json.load(f)
+
+
+    def saveManifest(self, manifest):
+        fd, tmp = tempfile.mkstemp(dir=self.replicaDir)
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.manifest)
+
+
+    def checkTarget(self):
+        """
+          Refuse to sync into anything other than an existing replica or a
+          new, empty directory, so a CA can never be overwritten.
+        """
+        if isReplica(self.ca.rootDir):
+            raise ValueError("{} is a replica and cannot be mirrored".format(self.ca.rootDir))
+
+        if Path(self.replicaDir).exists() and not Path(self.replicaDir).is_dir():
+            raise ValueError("{} is not a directory".format(self.replicaDir))
+
+        if Path(self.replicaDir, "openssl.config").exists():
+            raise ValueError("{} contains a CA and cannot be used as replica".format(self.replicaDir))
+
+        if Path(self.replicaDir).exists() and not self.manifest.exists() \
+           and any(os.scandir(self.replicaDir)):
+            raise ValueError("{} is not empty and not a replica".format(self.replicaDir))
+
+
+    def createDirectories(self):
+        os.makedirs(self.replicaDir, exist_ok=True)
+        for key in mirrored_subdirs:
+            path = os.path.relpath(self.ca.subdirs[key]['path'], self.ca.rootDir)
+            os.makedirs(os.path.join(self.replicaDir, path), mode=0o755, exist_ok=True)
+
+
+    def replaceFile(self, dest, src, offset, count, digest):
+        """
+          Write count bytes from the open file src, starting at offset, to
+          dest. With a non-zero offset, the first offset bytes are taken
+          from the current dest instead, so only the new part is read from
+          src. The result is written to a temporary file that replaces dest,
+          so readers on the replica never see a partially written file.
+
+          Returns the number of bytes taken from src.
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if offset:
+                    with open(dest, "rb") as old:
+                        copyBytes(old, out, offset)
+                src.seek(offset)
+                copied = copyBytes(src, out, count, digest)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, dest)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return copied
+
+
+    def syncFile(self, relpath, state):
+        """
+          Bring a single file on the replica up to date. Returns the new
+          state of the file and the action taken, or None as action when
+          the file did not change.
+
+          Files that only grew, like the index, get just the appended part
+          copied when the previously synced content is unchanged. The source
+          is opened once and exactly the bytes that were hashed and copied
+          are recorded, so lines added during a sync are picked up by the
+          next one.
+        """
+        src  = os.path.join(self.ca.rootDir, relpath)
+        dest = os.path.join(self.replicaDir, relpath)
+
+        with open(src, "rb") as f:
+            stat = os.fstat(f.fileno())
+
+            #  The shortcuts below rely on the replica still holding exactly
+            #  what was synced last time
+            intact = state is not None and Path(dest).exists() \
+                     and os.stat(dest).st_size == state['size']
+
+            if intact and state['size'] == stat.st_size and state['mtime'] == stat.st_mtime_ns:
+                return state, None
+
+            digest = hashlib.sha256()
+            offset = 0
+            if intact and stat.st_size > state['size']:
+                copyBytes(f, DigestWriter(digest), state['size'])
+                if digest.hexdigest() == state['sha256']:
+                    offset = state['size']
+                else:
+                    digest = hashlib.sha256()
+
+            copied = self.replaceFile(dest, f, offset, stat.st_size - offset, digest)
+
+        if offset:
+            action = "append"
+        else:
+            action = "copy" if state is None else "update"
+
+        newState = {
+            'size':   offset + copied,
+            'mtime':  stat.st_mtime_ns,
+            'sha256': digest.hexdigest()
+        }
+        return newState, action
+
+
+    def sync(self):
+        """
+          Synchronise the replica with the CA. Returns the sequence number
+          of this sync and the list of (action, path) changes that were
+          made.
+        """
+        self.checkTarget()
+        self.createDirectories()
+
+        manifest = self.loadManifest()
+        old      = manifest['files']
+        files    = {}
+        changes  = []
+
+        for relpath in self.getSourcePaths():
+            files[relpath], action = self.syncFile(relpath, old.get(relpath))
+            if action:
+                changes.append((action, relpath))
+
+        for relpath in old:
+            if relpath not in files:
+                dest = os.path.join(self.replicaDir, relpath)
+                if Path(dest).exists():
+                    os.remove(dest)
+                changes.append(("delete", relpath))
+
+        if not changes:
+            return manifest['sequence'], changes
+
+        #  Entries past the size recorded in the manifest were written by a
+        #  sync that did not complete, so they are dropped before appending
+        sequence = manifest['sequence'] + 1
+        with open(self.changelog, "ab") as f:
+            f.truncate(manifest.get('changelog', 0))
+            for action, relpath in changes:
+                f.write("{}\t{}\t{}\n".format(sequence, action, relpath).encode("utf-8"))
+
+        self.saveManifest({ 'sequence':  sequence,
+                            'changelog': os.path.getsize(self.changelog),
+                            'files':     files })
+
+        return sequence, changes
+
+
+    def getChanges(self, since=0):
+        """
+          Yield the (sequence, action, path) entries from the change log of
+          the replica that are newer than the given sequence number. Only
+          entries of completed syncs, as recorded in the manifest, are
+          returned.
+        """
+        if not self.changelog.exists():
+            return
+
+        committed = self.loadManifest().get('changelog', 0)
+
+        with open(self.changelog, "rb") as f:
+            while f.tell() < committed:
+                line = f.readline().decode("utf-8")
+                if not line:
+                    break
+                sequence, action, relpath = line.rstrip("\n").split("\t", 2)
+                if int(sequence) > since:
+                    yield int(sequence), action, relpath
@@ -0,0 +1,79 @@
+import os
+import tarfile
+
+import pytest
+
+pytest.importorskip("click")
+pytest.importorskip("jinja2")
+
+from ca_scripts.ca import CA, GlobalOptions
+from ca_scripts.database import readIndex
+
+
+def createCA(rootDir):
+    """
+      Create the directories and files of a CA without generating keys or
+      certificates; placeholders stand in for those.
+    """
+    ca = CA(GlobalOptions(rootDir, 0), missing_ca_dir_okay=True)
+    ca.createDirectories()
+    ca.createIndex()
+    ca.createInitialSerialNumbers(1000)
+    for key in ['rootConfig', 'intermediateConfig']:
+        open(ca.files[key], "w").close()
+
+    with open(ca.files['intermediateIndex'], "w") as f:
+        f.write("V\t261029060433Z\t\t1000\tunknown\t/CN=h1\n")
+    with open(ca.files['CAcertificateChain'], "w") as f:
+        f.write("chain")
+    with open(ca.subdirs['intermediate_newcerts']['path'] + "/h1.pem", "w") as f:
+        f.write("certificate")
+
+    return CA(GlobalOptions(rootDir, 0))
+
+
+@pytest.fixture
+def ca(tmp_path):
+    return createCA(str(tmp_path / "ca"))
+
+
+def test_replica_serves_lookups(ca, tmp_path, monkeypatch, capsys):
+    replicaDir = str(tmp_path / "replica")
+    ca.mirror(replicaDir)
+
+    assert not os.path.exists(replicaDir + "/openssl.config")
+    assert not os.path.exists(replicaDir + "/private")
+
+    replica = CA(GlobalOptions(replicaDir, 0), "h1")
+    assert [r.serial for r in readIndex(replica.files['intermediateIndex'])] == ['1000']
+
+    replica.listCertificates()
+    assert "/CN=h1" in capsys.readouterr().out
+
+    monkeypatch.chdir(tmp_path)
+    replica.getCerts()
+    with tarfile.open("h1.tb2") as tar:
+        assert sorted(tar.getnames()) == ["chain.pem", "h1.pem"]
+
+
+def test_mirror_refuses_ca_directory(ca):
+    with pytest.raises(ValueError, match="must differ"):
+        ca.mirror(ca.rootDir)
+
+
+def test_mirror_refuses_other_ca(ca, tmp_path):
+    other = createCA(str(tmp_path / "other"))
+
+    with pytest.raises(ValueError, match="contains a CA"):
+        ca.mirror(other.rootDir)
+    assert [r.serial for r in readIndex(other.files['intermediateIndex'])] == ['1000']
+
+
+def test_mirror_refuses_replica_as_source(ca, tmp_path):
+    replicaDir = str(tmp_path / "replica")
+    ca.mirror(replicaDir)
+    replica = CA(GlobalOptions(replicaDir, 0))
+
+    with pytest.raises(ValueError, match="is a replica"):
+        replica.mirror(ca.rootDir)
+    assert not os.path.exists(ca.rootDir + "/.mirror")
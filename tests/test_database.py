@@ -0,0 +1,76 @@
+import base64
+import os
+
+import pytest
+
+from ca_scripts.database import readIndex, readCRL
+
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+
+def dataFile(name):
+    return os.path.join(data_dir, name)
+
+
+def test_read_index():
+    records = list(readIndex(dataFile("index.txt")))
+
+    assert [r.status for r in records] == ['V', 'R', 'R']
+    assert [r.serial for r in records] == ['1000', '1001', '1002']
+    assert records[0].getRevocationDate() is None
+    assert records[2].revoked == "261019060434Z,keyCompromise"
+    assert records[2].getRevocationDate().isoformat() == "2026-10-19T06:04:34+00:00"
+    assert records[2].subject == "/CN=h3"
+
+
+def test_read_empty_index(tmp_path):
+    index = tmp_path / "index.txt"
+    index.touch()
+
+    assert list(readIndex(str(index))) == []
+
+
+def test_read_index_with_non_utf8_subject(tmp_path):
+    index = tmp_path / "index.txt"
+    index.write_bytes(b"V\t261029060433Z\t\t1000\tunknown\t/CN=M\xfcller\n"
+                      b"V\t261029060433Z\t\t1001\tunknown\t/CN=h2\n")
+
+    records = list(readIndex(str(index)))
+
+    assert [r.serial for r in records] == ['1000', '1001']
+    assert records[0].subject == "/CN=M\ufffdller"
+
+
+@pytest.mark.parametrize("name", ["crl.pem", "crl.der"])
+def test_read_crl(name):
+    records = list(readCRL(dataFile(name)))
+
+    assert [(r.serial, r.revoked) for r in records] == [
+        ('1001', "261019060434Z"),
+        ('1002', "261019060434Z")
+    ]
+
+
+def test_read_truncated_crl(tmp_path):
+    with open(dataFile("crl.der"), "rb") as f:
+        der = f.read()
+    crl = tmp_path / "truncated.der"
+    crl.write_bytes(der[:len(der) // 2])
+
+    with pytest.raises(ValueError, match="Malformed CRL"):
+        list(readCRL(str(crl)))
+
+
+def test_read_certificate_as_crl(tmp_path):
+    with pytest.raises(ValueError, match="Malformed CRL"):
+        list(readCRL(dataFile("certificate.pem")))
+
+    with open(dataFile("certificate.pem"), "rb") as f:
+        pem = f.read().decode("ascii")
+    body = "".join(pem.splitlines()[1:-1])
+    der = tmp_path / "certificate.der"
+    der.write_bytes(base64.b64decode(body))
+
+    with pytest.raises(ValueError, match="Malformed CRL"):
+        list(readCRL(str(der)))
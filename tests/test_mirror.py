@@ -0,0 +1,224 @@
+import os
+
+import pytest
+
+from ca_scripts.mirror import Mirror
+from ca_scripts.database import readIndex
+
+
+class LocalCA():
+    """
+      The parts of the CA directory layout that Mirror relies on.
+    """
+
+    def __init__(self, rootDir):
+        self.rootDir = rootDir
+        self.subdirs = {}
+        for key, path in [('root_certs',            "/certs"),
+                          ('root_crl',              "/crl"),
+                          ('root_newcerts',         "/newcerts"),
+                          ('intermediate_certs',    "/intermediate/certs"),
+                          ('intermediate_crl',      "/intermediate/crl"),
+                          ('intermediate_newcerts', "/intermediate/newcerts"),
+                          ('intermediate_private',  "/intermediate/private")]:
+            self.subdirs[key] = { 'path': rootDir + path }
+            os.makedirs(rootDir + path)
+
+        self.files = {
+            'rootIndex':         rootDir + "/index.txt",
+            'intermediateIndex': rootDir + "/intermediate/index.txt"
+        }
+        for path in self.files.values():
+            open(path, "w").close()
+
+
+def indexLine(serial, status="V", revoked=""):
+    return "{}\t261029060433Z\t{}\t{}\tunknown\t/CN={}\n".format(status, revoked,
+                                                              serial, serial)
+
+
+def appendIndex(ca, line):
+    with open(ca.files['intermediateIndex'], "a") as f:
+        f.write(line)
+
+
+def readFile(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def ca(tmp_path):
+    ca = LocalCA(str(tmp_path / "ca"))
+    appendIndex(ca, indexLine("1000"))
+    with open(ca.subdirs['intermediate_newcerts']['path'] + "/h1.pem", "w") as f:
+        f.write("certificate")
+    with open(ca.subdirs['intermediate_private']['path'] + "/h1.key", "w") as f:
+        f.write("key")
+    return ca
+
+
+@pytest.fixture
+def replica(tmp_path):
+    return str(tmp_path / "replica")
+
+
+def test_first_sync_copies_public_files(ca, replica):
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert sequence == 1
+    assert ("copy", "intermediate/index.txt") in changes
+    assert ("copy", "intermediate/newcerts/h1.pem") in changes
+    assert readFile(replica + "/intermediate/newcerts/h1.pem") == "certificate"
+    assert not os.path.exists(replica + "/intermediate/private")
+
+    assert Mirror(ca, replica).sync() == (1, [])
+
+
+def test_sync_appends_to_index(ca, replica):
+    Mirror(ca, replica).sync()
+    appendIndex(ca, indexLine("1001"))
+
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert (sequence, changes) == (2, [("append", "intermediate/index.txt")])
+    assert readFile(replica + "/intermediate/index.txt") == \
+           readFile(ca.files['intermediateIndex'])
+
+
+def test_sync_updates_rewritten_index(ca, replica):
+    appendIndex(ca, indexLine("1001"))
+    Mirror(ca, replica).sync()
+
+    # Like openssl, revoking writes a new index and renames it over the old
+    index = ca.files['intermediateIndex']
+    with open(index + ".new", "w") as f:
+        f.write(indexLine("1000"))
+        f.write(indexLine("1001", "R", "261019060434Z"))
+        f.write(indexLine("1002"))
+    os.replace(index + ".new", index)
+
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert (sequence, changes) == (2, [("update", "intermediate/index.txt")])
+    assert [r.status for r in readIndex(replica + "/intermediate/index.txt")] == \
+           ['V', 'R', 'V']
+
+
+def test_sync_deletes_removed_files(ca, replica):
+    Mirror(ca, replica).sync()
+    os.remove(ca.subdirs['intermediate_newcerts']['path'] + "/h1.pem")
+
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert (sequence, changes) == (2, [("delete", "intermediate/newcerts/h1.pem")])
+    assert not os.path.exists(replica + "/intermediate/newcerts/h1.pem")
+
+
+def test_sync_with_concurrent_append(ca, replica, monkeypatch):
+    Mirror(ca, replica).sync()
+    appendIndex(ca, indexLine("1001"))
+
+    replaceFile = Mirror.replaceFile
+
+    def appendDuringSync(self, dest, src, offset, count, digest):
+        if dest.endswith("intermediate/index.txt"):
+            appendIndex(ca, indexLine("race"))
+        return replaceFile(self, dest, src, offset, count, digest)
+
+    monkeypatch.setattr(Mirror, "replaceFile", appendDuringSync)
+    Mirror(ca, replica).sync()
+    monkeypatch.undo()
+    Mirror(ca, replica).sync()
+
+    content = readFile(replica + "/intermediate/index.txt")
+    assert content == readFile(ca.files['intermediateIndex'])
+    assert content.count("/CN=race") == 1
+
+
+def test_get_changes(ca, replica):
+    Mirror(ca, replica).sync()
+    appendIndex(ca, indexLine("1001"))
+    Mirror(ca, replica).sync()
+
+    assert list(Mirror(None, replica).getChanges(1)) == \
+           [(2, "append", "intermediate/index.txt")]
+    assert len(list(Mirror(None, replica).getChanges())) == 4
+    assert list(Mirror(None, str(replica) + "-missing").getChanges()) == []
+
+
+def test_refuse_non_empty_target(ca, replica):
+    os.makedirs(replica)
+    open(replica + "/notes.txt", "w").close()
+
+    with pytest.raises(ValueError, match="not empty"):
+        Mirror(ca, replica).sync()
+    assert os.listdir(replica) == ["notes.txt"]
+
+
+def test_refuse_target_with_ca(ca, tmp_path):
+    other = LocalCA(str(tmp_path / "other"))
+    open(other.rootDir + "/openssl.config", "w").close()
+    open(other.rootDir + "/.mirror", "w").close()
+
+    with pytest.raises(ValueError, match="contains a CA"):
+        Mirror(ca, other.rootDir).sync()
+    assert readFile(other.files['intermediateIndex']) == ""
+
+
+def test_refuse_replica_as_source(ca, replica, tmp_path):
+    Mirror(ca, replica).sync()
+    source = LocalCA(str(tmp_path / "source"))
+    open(source.rootDir + "/.mirror", "w").close()
+
+    with pytest.raises(ValueError, match="is a replica"):
+        Mirror(source, replica).sync()
+
+
+def test_sync_restores_missing_replica_file(ca, replica):
+    Mirror(ca, replica).sync()
+    dest = replica + "/intermediate/newcerts/h1.pem"
+    os.remove(dest)
+
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert (sequence, changes) == (2, [("update", "intermediate/newcerts/h1.pem")])
+    assert readFile(dest) == "certificate"
+
+
+def test_sync_copies_over_short_replica_file(ca, replica):
+    appendIndex(ca, indexLine("1001"))
+    Mirror(ca, replica).sync()
+    dest = replica + "/intermediate/index.txt"
+    os.chmod(dest, 0o644)
+    with open(dest, "w") as f:
+        f.write(indexLine("1000"))
+    appendIndex(ca, indexLine("1002"))
+
+    sequence, changes = Mirror(ca, replica).sync()
+
+    assert changes == [("update", "intermediate/index.txt")]
+    assert readFile(dest) == readFile(ca.files['intermediateIndex'])
+
+
+def test_interrupted_sync_is_not_logged(ca, replica, monkeypatch):
+    Mirror(ca, replica).sync()
+    appendIndex(ca, indexLine("1001"))
+
+    def crash(self, manifest):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(Mirror, "saveManifest", crash)
+    with pytest.raises(KeyboardInterrupt):
+        Mirror(ca, replica).sync()
+    monkeypatch.undo()
+
+    assert list(Mirror(None, replica).getChanges(1)) == []
+
+    os.remove(ca.subdirs['intermediate_newcerts']['path'] + "/h1.pem")
+    Mirror(ca, replica).sync()
+
+    assert list(Mirror(None, replica).getChanges(1)) == [
+        (2, "update", "intermediate/index.txt"),
+        (2, "delete", "intermediate/newcerts/h1.pem")
+    ]